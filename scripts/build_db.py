@@ -4,18 +4,30 @@ Import all data from crawl results JSON files (sorted by time, oldest first)
 Optimized for performance with batch inserts
 """
 
-import json
 import logging
 import argparse
 from pathlib import Path
-from datetime import datetime
 import sys
+import os
 import re
+import gzip
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import orjson
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
-from crawler.database_v2 import DatabaseV2
+from crawler.database_v2 import (
+    DatabaseV2, SellerRow, ProductRow, PriceHistoryRow,
+    SalesHistoryRow, RatingHistoryRow, ProductDetailsRow
+)
+
+
+# Timestamp embedded in crawl result filenames (YYYYMMDD_HHMMSS)
+TIMESTAMP_PATTERN = re.compile(r'(\d{8}_\d{6})')
 
 
 def setup_logging():
@@ -30,33 +42,45 @@ def setup_logging():
     return logging.getLogger(__name__)
 
 
-def extract_timestamp_from_filename(filename: str) -> datetime:
-    """Extract timestamp from filename like parallel_crawl_results_20251121_022421.json"""
-    match = re.search(r'(\d{8}_\d{6})', filename)
-    if match:
-        try:
-            return datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
-        except:
-            pass
-    # Fallback to file modification time
-    return datetime.fromtimestamp(Path(filename).stat().st_mtime)
+def extract_timestamp_from_filename(filename: str) -> str:
+    """
+    Extract timestamp from filename like parallel_crawl_results_20251121_022421.json(.gz)
+    
+    Returns the raw YYYYMMDD_HHMMSS string, which sorts chronologically as-is,
+    or an empty string when the filename has no timestamp.
+    """
+    match = TIMESTAMP_PATTERN.search(filename)
+    return match.group(1) if match else ''
 
 
 def get_sorted_json_files(raw_dir: Path) -> list:
-    """Get all JSON files sorted by timestamp (oldest first)"""
-    json_files = list(raw_dir.glob('parallel_crawl_results_*.json'))
-    # Sort by timestamp extracted from filename
-    json_files.sort(key=lambda p: extract_timestamp_from_filename(p.name))
+    """Get all JSON files (plain or gzip-compressed) sorted by timestamp (oldest first)"""
+    # Extract each timestamp once, then sort (string order == chronological order)
+    timestamped = [
+        (extract_timestamp_from_filename(p.name), p)
+        for pattern in ('parallel_crawl_results_*.json', 'parallel_crawl_results_*.json.gz')
+        for p in raw_dir.glob(pattern)
+    ]
+    timestamped.sort(key=lambda item: item[0])
+    json_files = [p for _, p in timestamped]
+    
+    undated = [p.name for timestamp, p in timestamped if not timestamp]
+    if undated:
+        logging.getLogger(__name__).warning(
+            f"No timestamp in filename, processed first: {', '.join(undated)}"
+        )
     return json_files
 
 
 def load_json_file(json_path: Path) -> dict:
-    """Load JSON file"""
+    """Load JSON file (.json or gzip-compressed .json.gz)"""
     logger = logging.getLogger(__name__)
     try:
         logger.info(f"Loading {json_path.name}...")
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        raw = json_path.read_bytes()
+        if json_path.suffix == '.gz':
+            raw = gzip.decompress(raw)
+        data = orjson.loads(raw)
         product_count = len(data.get('all_products', []))
         logger.info(f"  ✓ Loaded {json_path.name}: {product_count} products")
         return data
@@ -65,29 +89,36 @@ def load_json_file(json_path: Path) -> dict:
         raise
 
 
-def process_and_store_products_batch(results: dict, db: DatabaseV2, logger, 
-                                     existing_products: set, existing_sellers: set):
-    """Process crawl results and store in database with batch operations"""
+def build_product_rows(results: dict) -> dict:
+    """
+    Turn crawl results into row batches for each table (no database access)
+    
+    Pure function so it can run in a worker process.
+    
+    Returns:
+        Dictionary with one list of rows per table and the failed product count
+    """
+    logger = logging.getLogger(__name__)
     all_products = results.get('all_products', [])
-    successful = 0
-    failed = 0
     
     # Get start_time from crawl results to use as crawl_timestamp
     crawl_timestamp = results.get('start_time')
     
-    # Prepare batch data
-    products_batch = []
-    sellers_batch = []
-    price_history_batch = []
-    sales_history_batch = []
-    rating_history_batch = []
-    product_details_batch = []
+    rows = {
+        'products': [],
+        'sellers': [],
+        'price_history': [],
+        'sales_history': [],
+        'rating_history': [],
+        'product_details': [],
+        'failed': 0
+    }
     
-    new_sellers = set()
+    seen_sellers = set()
     
     for product in all_products:
         if not product.get('success'):
-            failed += 1
+            rows['failed'] += 1
             continue
         
         try:
@@ -96,103 +127,111 @@ def process_and_store_products_batch(results: dict, db: DatabaseV2, logger,
             category_id = product.get('category_id')
             category_name = product.get('category_name')
             
-            # Collect seller info
+            # Collect seller info (deduplicated within this file only)
             seller_info = details.get('seller_info_enriched', {})
             seller_id = seller_info.get('id')
-            if seller_id and seller_id not in existing_sellers and seller_id not in new_sellers:
-                sellers_batch.append({
-                    'seller_id': seller_id,
-                    'seller_name': seller_info.get('name'),
-                    'seller_url': seller_info.get('link'),
-                    'seller_total_follower': seller_info.get('total_follower')
-                })
-                new_sellers.add(seller_id)
+            if seller_id and seller_id not in seen_sellers:
+                rows['sellers'].append(SellerRow(
+                    seller_id,
+                    seller_info.get('name'),
+                    seller_info.get('link'),
+                    seller_info.get('total_follower')
+                ))
+                seen_sellers.add(seller_id)
             
             # Collect product data
-            products_batch.append({
-                'id': product_id,
-                'name': details.get('name'),
-                'short_description': details.get('short_description'),
-                'url_key': details.get('url_key'),
-                'category_id': category_id,
-                'category_name': category_name
-            })
+            rows['products'].append(ProductRow(
+                product_id,
+                details.get('name'),
+                details.get('short_description'),
+                details.get('url_key'),
+                category_id,
+                category_name
+            ))
             
             # Collect history data
-            price_history_batch.append({
-                'product_id': product_id,
-                'price': details.get('price'),
-                'original_price': details.get('original_price'),
-                'discount': details.get('discount'),
-                'discount_rate': details.get('discount_rate'),
-                'crawl_timestamp': crawl_timestamp
-            })
+            rows['price_history'].append(PriceHistoryRow(
+                product_id,
+                details.get('price'),
+                details.get('original_price'),
+                details.get('discount'),
+                details.get('discount_rate'),
+                crawl_timestamp
+            ))
             
-            sales_history_batch.append({
-                'product_id': product_id,
-                'quantity_sold': details.get('quantity_sold', {}).get('value', 0),
-                'all_time_quantity_sold': details.get('all_time_quantity_sold', 0),
-                'crawl_timestamp': crawl_timestamp
-            })
+            rows['sales_history'].append(SalesHistoryRow(
+                product_id,
+                details.get('quantity_sold', {}).get('value', 0),
+                details.get('all_time_quantity_sold', 0),
+                crawl_timestamp
+            ))
             
-            rating_history_batch.append({
-                'product_id': product_id,
-                'rating_average': details.get('rating_average'),
-                'review_count': details.get('review_count'),
-                'crawl_timestamp': crawl_timestamp
-            })
+            rows['rating_history'].append(RatingHistoryRow(
+                product_id,
+                details.get('rating_average'),
+                details.get('review_count'),
+                crawl_timestamp
+            ))
             
             # Product details
             brand = details.get('brand')
             badges = details.get('badges_v3') or details.get('badges', [])
             
-            product_details_batch.append({
-                'product_id': product_id,
-                'brand': json.dumps(brand, ensure_ascii=False) if brand else None,
-                'badges': json.dumps(badges, ensure_ascii=False) if badges else None,
-                'seller_id': seller_id,
-                'crawl_timestamp': crawl_timestamp
-            })
-            
-            existing_products.add(product_id)
-            successful += 1
+            rows['product_details'].append(ProductDetailsRow(
+                product_id,
+                orjson.dumps(brand).decode() if brand else None,
+                orjson.dumps(badges).decode() if badges else None,
+                seller_id,
+                crawl_timestamp
+            ))
                 
         except Exception as e:
             logger.error(f"Failed to process product {product.get('product_id')}: {e}")
-            failed += 1
+            rows['failed'] += 1
+    
+    return rows
+
+
+def parse_json_file(json_path: Path) -> dict:
+    """Load one JSON file and build its row batches (runs in a worker process)"""
+    return build_product_rows(load_json_file(json_path))
+
+
+def store_product_rows(rows: dict, db: DatabaseV2, logger, existing_sellers: set):
+    """Store one file's row batches in database in a single transaction"""
+    new_sellers = [s for s in rows['sellers'] if s.seller_id not in existing_sellers]
+    successful = len(rows['products'])
     
-    # Batch insert
     try:
-        if sellers_batch:
-            db.insert_sellers_batch(sellers_batch)
-            existing_sellers.update(new_sellers)
-        
-        if products_batch:
-            db.insert_products_batch(products_batch)
-        
-        if price_history_batch:
-            db.insert_price_history_batch(price_history_batch)
-        
-        if sales_history_batch:
-            db.insert_sales_history_batch(sales_history_batch)
-        
-        if rating_history_batch:
-            db.insert_rating_history_batch(rating_history_batch)
-        
-        if product_details_batch:
-            db.insert_product_details_batch(product_details_batch)
-        
-        logger.info(f"  Batch inserted: {successful} products, {len(new_sellers)} sellers")
-        
+        # One transaction (one commit) for the whole file instead of one per table chunk
+        with db.transaction():
+            db.insert_sellers_batch(new_sellers, commit=False)
+            db.insert_products_batch(rows['products'], commit=False)
+            db.insert_price_history_batch(rows['price_history'], commit=False)
+            db.insert_sales_history_batch(rows['sales_history'], commit=False)
+            db.insert_rating_history_batch(rows['rating_history'], commit=False)
+            db.insert_product_details_batch(rows['product_details'], commit=False)
     except Exception as e:
         logger.error(f"Batch insert failed: {e}")
         raise
     
-    return successful, failed
+    existing_sellers.update(s.seller_id for s in new_sellers)
+    
+    logger.info(f"  Batch inserted: {successful} products, {len(new_sellers)} sellers")
+    
+    return successful, rows['failed']
 
 
-def build_database_from_all_json(json_files: list, db_path: str, logger):
-    """Build database from all JSON files"""
+def build_database_from_all_json(json_files: list, db_path: str, logger,
+                                 workers: Optional[int] = None):
+    """
+    Build database from all JSON files
+    
+    Files are parsed in parallel worker processes; the database writer stays
+    on the main thread and consumes results in chronological order. At most
+    2 * workers files are in flight, so parsed rows cannot pile up in memory
+    faster than the writer stores them.
+    """
     logger.info("=" * 70)
     logger.info("BUILDING DATABASE FROM ALL JSON FILES")
     logger.info("=" * 70)
@@ -203,35 +242,72 @@ def build_database_from_all_json(json_files: list, db_path: str, logger):
     
     # Initialize database
     db = DatabaseV2(db_path)
+    db.configure_bulk_load()
+    
+    # On a fresh build, load without secondary indexes and build each index once
+    # at the end; an existing database keeps its indexes
+    fresh_build = db.conn.execute("SELECT 1 FROM products LIMIT 1").fetchone() is None
+    if fresh_build:
+        db.drop_indexes()
     
-    # Track existing data to avoid duplicates
-    existing_products = set()
-    existing_sellers = set()
+    # Track stored sellers to avoid re-writing them (products are counted in SQL at the end);
+    # seeded from the database so sellers from a previous build are not re-sent
+    existing_sellers = {row[0] for row in db.conn.execute("SELECT seller_id FROM sellers")}
     
     total_successful = 0
     total_failed = 0
     
     try:
-        for idx, json_file in enumerate(json_files, 1):
-            logger.info(f"[{idx}/{len(json_files)}] Processing {json_file.name}...")
+        try:
+            max_workers = workers or os.cpu_count() or 1
+            max_in_flight = 2 * max_workers
             
-            try:
-                # Load JSON data
-                results = load_json_file(json_file)
-                
-                # Process and store products
-                successful, failed = process_and_store_products_batch(
-                    results, db, logger, existing_products, existing_sellers
-                )
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                # Sliding window of submitted files, consumed in submission order and
+                # refilled as each result is taken
+                pending_files = iter(json_files)
+                in_flight = deque()
+                for json_file in pending_files:
+                    in_flight.append((json_file, executor.submit(parse_json_file, json_file)))
+                    if len(in_flight) >= max_in_flight:
+                        break
                 
-                total_successful += successful
-                total_failed += failed
-                
-                logger.info(f"  ✓ Completed: {successful} products stored, {failed} failed")
-                
-            except Exception as e:
-                logger.error(f"  ✗ Failed to process {json_file.name}: {e}")
-                continue
+                idx = 0
+                while in_flight:
+                    json_file, future = in_flight.popleft()
+                    next_file = next(pending_files, None)
+                    if next_file is not None:
+                        in_flight.append((next_file, executor.submit(parse_json_file, next_file)))
+                    
+                    idx += 1
+                    logger.info(f"[{idx}/{len(json_files)}] Processing {json_file.name}...")
+                    
+                    try:
+                        # Wait for the parsed rows of this file
+                        rows = future.result()
+                        
+                        # Store products
+                        successful, failed = store_product_rows(
+                            rows, db, logger, existing_sellers
+                        )
+                        
+                        total_successful += successful
+                        total_failed += failed
+                        
+                        logger.info(f"  ✓ Completed: {successful} products stored, {failed} failed")
+                        
+                    except Exception as e:
+                        logger.error(f"  ✗ Failed to process {json_file.name}: {e}")
+                        continue
+        finally:
+            # Restore the indexes even if the load is interrupted (e.g. Ctrl+C)
+            if fresh_build:
+                if db.conn.in_transaction:
+                    db.conn.rollback()
+                logger.info("Creating indexes...")
+                db.create_indexes()
+        
+        db.conn.execute("ANALYZE")
         
         # Summary
         logger.info("")
@@ -240,7 +316,8 @@ def build_database_from_all_json(json_files: list, db_path: str, logger):
         logger.info(f"Total files processed: {len(json_files)}")
         logger.info(f"Total products stored: {total_successful}")
         logger.info(f"Total products failed: {total_failed}")
-        logger.info(f"Unique products: {len(existing_products)}")
+        unique_products = db.conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        logger.info(f"Unique products: {unique_products}")
         logger.info(f"Unique sellers: {len(existing_sellers)}")
         logger.info(f"Database: {db_path}")
         logger.info("=" * 70)
@@ -259,6 +336,8 @@ def main():
                        help='Path to database file')
     parser.add_argument('--raw-dir', default='data/raw',
                        help='Directory containing JSON files')
+    parser.add_argument('--workers', type=int,
+                       help='Number of processes parsing JSON files (default: CPU count)')
     
     args = parser.parse_args()
     
@@ -279,7 +358,7 @@ def main():
     db_path.parent.mkdir(parents=True, exist_ok=True)
     
     # Build database from all files
-    build_database_from_all_json(json_files, str(db_path), logger)
+    build_database_from_all_json(json_files, str(db_path), logger, workers=args.workers)
 
 
 if __name__ == '__main__':
@@ -3,13 +3,19 @@ Main script for PARALLEL multi-category crawling
 Fast crawling with concurrent workers
 """
 
-import json
 import logging
+import logging.handlers
+import atexit
 import argparse
+import gzip
+import queue
+import threading
 from datetime import datetime
 from pathlib import Path
 import sys
 
+import orjson
+
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
@@ -17,7 +23,12 @@ from crawler.crawler_parallel import TikiParallelCrawler
 
 
 def setup_logging(config: dict):
-    """Setup logging"""
+    """
+    Setup logging
+    
+    Crawler threads only put records on a queue; a QueueListener thread formats
+    and writes them to the file/console, so workers never block on log I/O.
+    """
     log_config = config.get('logging', {})
     log_dir = Path(log_config.get('log_dir', 'logs/crawler'))
     log_dir.mkdir(parents=True, exist_ok=True)
@@ -25,13 +36,26 @@ def setup_logging(config: dict):
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     log_file = log_dir / f'parallel_crawl_{timestamp}.log'
     
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [
+        logging.FileHandler(log_file, encoding='utf-8'),
+        logging.StreamHandler()
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.Queue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)  # Flush remaining records on exit
+    
+    # Only merge the message here; timestamps/levels are formatted by the listener
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
-            logging.StreamHandler()
-        ]
+        handlers=[queue_handler]
     )
     
     return logging.getLogger(__name__)
@@ -39,23 +63,107 @@ def setup_logging(config: dict):
 
 def load_config(config_path: str = 'config/config.json') -> dict:
     """Load configuration"""
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    with open(config_path, 'rb') as f:
+        return orjson.loads(f.read())
 
 
-def save_crawl_data(data: dict, output_dir: Path):
-    """Save crawl results to JSON"""
+def crawl_data_filename(output_dir: Path) -> Path:
+    """Timestamped path for a raw crawl results file (gzip-compressed JSON)"""
     output_dir.mkdir(exist_ok=True)
     
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = output_dir / f'parallel_crawl_results_{timestamp}.json'
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    
-    return filename
+    return output_dir / f'parallel_crawl_results_{timestamp}.json.gz'
 
 
+def write_json_fields(data: dict, f, first: bool = True):
+    """
+    Write dict items as JSON object fields (compact, UTF-8, serialized with orjson)
+    
+    Top-level lists are streamed one item at a time, so the whole document is
+    never held in memory as a single bytes object. Braces are left to the caller.
+    """
+    for key, value in data.items():
+        if not first:
+            f.write(b',')
+        first = False
+        f.write(orjson.dumps(key) + b':')
+        
+        if isinstance(value, list):
+            f.write(b'[')
+            for j, item in enumerate(value):
+                if j:
+                    f.write(b',')
+                f.write(orjson.dumps(item))
+            f.write(b']')
+        else:
+            f.write(orjson.dumps(value))
+
+
+def write_products_from_queue(result_queue: queue.Queue, f, errors: list):
+    """
+    Writer thread: append product results from the queue to an open JSON array
+    until the None sentinel arrives
+    """
+    first = True
+    while True:
+        product = result_queue.get()
+        if product is None:
+            break
+        if errors:
+            continue  # Keep draining so the crawler never blocks on a full queue
+        
+        try:
+            if not first:
+                f.write(b',')
+            first = False
+            f.write(orjson.dumps(product))
+        except Exception as e:
+            errors.append(e)
+
+
+def crawl_and_save(crawler: TikiParallelCrawler, output_dir: Path):
+    """
+    Crawl all categories while a writer thread streams finished products to disk
+    
+    Network-bound crawling and file writing overlap instead of running one after
+    the other. The file is gzip-compressed (level 1: fast, still several times
+    smaller than plain JSON) and written as *.part, then renamed once complete,
+    so an interrupted crawl never leaves a truncated file for build_db/update_db.
+    
+    Returns:
+        (crawl results without all_products, path of the saved JSON file)
+    """
+    filename = crawl_data_filename(output_dir)
+    part_file = filename.with_name(filename.name + '.part')
+    result_queue = queue.Queue(maxsize=1000)
+    errors = []
+    
+    try:
+        with gzip.open(part_file, 'wb', compresslevel=1) as f:
+            f.write(b'{"all_products":[')
+            writer = threading.Thread(target=write_products_from_queue,
+                                      args=(result_queue, f, errors), daemon=True)
+            writer.start()
+            try:
+                results = crawler.crawl_all_categories_parallel(result_queue=result_queue)
+            finally:
+                # Sentinel: let the writer drain the queue and stop
+                result_queue.put(None)
+                writer.join()
+            
+            if errors:
+                raise errors[0]
+            
+            f.write(b']')
+            summary = {k: v for k, v in results.items() if k != 'all_products'}
+            write_json_fields(summary, f, first=False)
+            f.write(b'}')
+    except BaseException:
+        part_file.unlink(missing_ok=True)
+        raise
+    
+    part_file.replace(filename)
+    return results, filename
 
 
 def run_parallel_crawl(config: dict, logger):
@@ -70,12 +178,9 @@ def run_parallel_crawl(config: dict, logger):
     crawler = TikiParallelCrawler(config)
     
     try:
-        # Crawl all categories with parallel workers
-        results = crawler.crawl_all_categories_parallel()
-        
-        # Save raw results to JSON
+        # Crawl all categories with parallel workers, saving raw results to JSON as they arrive
         data_dir = Path(config.get('database', {}).get('data_dir', 'data/raw'))
-        json_file = save_crawl_data(results, data_dir)
+        results, json_file = crawl_and_save(crawler, data_dir)
         logger.info(f"Raw results saved to: {json_file}")
         
         # Summary
@@ -103,7 +208,7 @@ def main():
     parser = argparse.ArgumentParser(description='Parallel multi-category Tiki crawler')
     parser.add_argument('--config', default='config/config.json', help='Config file path')
     parser.add_argument('--workers', type=int, help='Number of parallel workers (overrides config)')
-    parser.add_argument('--rate-limit', type=int, help='Max requests per second (overrides config)')
+    parser.add_argument('--rate-limit', type=int, help='Max requests per second, 0 = unlimited (overrides config)')
     
     args = parser.parse_args()
     
@@ -113,7 +218,7 @@ def main():
     # Override config with command line args
     if args.workers:
         config['crawler']['max_workers'] = args.workers
-    if args.rate_limit:
+    if args.rate_limit is not None:
         config['crawler']['rate_limit_per_second'] = args.rate_limit
     
     logger = setup_logging(config)
@@ -4,18 +4,28 @@ Add new data or update existing data from crawl results
 Optimized for performance with batch inserts
 """
 
-import json
 import logging
 import argparse
 from pathlib import Path
-from datetime import datetime
 import sys
 import re
+import gzip
+
+import orjson
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
-from crawler.database_v2 import DatabaseV2
+from crawler.database_v2 import (
+    DatabaseV2, SellerRow, ProductRow, PriceHistoryRow,
+    SalesHistoryRow, RatingHistoryRow, ProductDetailsRow
+)
+
+# Flush accumulated rows to the database every BATCH_SIZE products
+BATCH_SIZE = 10_000
+
+# Timestamp embedded in crawl result filenames (YYYYMMDD_HHMMSS)
+TIMESTAMP_PATTERN = re.compile(r'(\d{8}_\d{6})')
 
 
 def setup_logging():
@@ -30,33 +40,45 @@ def setup_logging():
     return logging.getLogger(__name__)
 
 
-def extract_timestamp_from_filename(filename: str) -> datetime:
-    """Extract timestamp from filename like parallel_crawl_results_20251121_022421.json"""
-    match = re.search(r'(\d{8}_\d{6})', filename)
-    if match:
-        try:
-            return datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
-        except:
-            pass
-    # Fallback to file modification time
-    return datetime.fromtimestamp(Path(filename).stat().st_mtime)
+def extract_timestamp_from_filename(filename: str) -> str:
+    """
+    Extract timestamp from filename like parallel_crawl_results_20251121_022421.json(.gz)
+    
+    Returns the raw YYYYMMDD_HHMMSS string, which sorts chronologically as-is,
+    or an empty string when the filename has no timestamp.
+    """
+    match = TIMESTAMP_PATTERN.search(filename)
+    return match.group(1) if match else ''
 
 
 def get_sorted_json_files(raw_dir: Path) -> list:
-    """Get all JSON files sorted by timestamp (oldest first)"""
-    json_files = list(raw_dir.glob('parallel_crawl_results_*.json'))
-    # Sort by timestamp extracted from filename
-    json_files.sort(key=lambda p: extract_timestamp_from_filename(p.name))
+    """Get all JSON files (plain or gzip-compressed) sorted by timestamp (oldest first)"""
+    # Extract each timestamp once, then sort (string order == chronological order)
+    timestamped = [
+        (extract_timestamp_from_filename(p.name), p)
+        for pattern in ('parallel_crawl_results_*.json', 'parallel_crawl_results_*.json.gz')
+        for p in raw_dir.glob(pattern)
+    ]
+    timestamped.sort(key=lambda item: item[0])
+    json_files = [p for _, p in timestamped]
+    
+    undated = [p.name for timestamp, p in timestamped if not timestamp]
+    if undated:
+        logging.getLogger(__name__).warning(
+            f"No timestamp in filename, processed first: {', '.join(undated)}"
+        )
     return json_files
 
 
 def load_json_file(json_path: Path) -> dict:
-    """Load JSON file"""
+    """Load JSON file (.json or gzip-compressed .json.gz)"""
     logger = logging.getLogger(__name__)
     try:
         logger.info(f"Loading {json_path.name}...")
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        raw = json_path.read_bytes()
+        if json_path.suffix == '.gz':
+            raw = gzip.decompress(raw)
+        data = orjson.loads(raw)
         product_count = len(data.get('all_products', []))
         logger.info(f"  ✓ Loaded {json_path.name}: {product_count} products")
         return data
@@ -103,6 +125,37 @@ def process_and_store_products_batch(results: dict, db: DatabaseV2, logger,
     new_sellers = set()
     new_product_ids = set()
     
+    def flush_batches():
+        """Insert the accumulated batches in one transaction and start new ones"""
+        try:
+            with db.transaction():
+                if sellers_batch:
+                    db.insert_sellers_batch(sellers_batch, commit=False)
+                
+                if products_batch:
+                    db.insert_products_batch(products_batch, commit=False)
+                
+                if price_history_batch:
+                    db.insert_price_history_batch(price_history_batch, commit=False)
+                
+                if sales_history_batch:
+                    db.insert_sales_history_batch(sales_history_batch, commit=False)
+                
+                if rating_history_batch:
+                    db.insert_rating_history_batch(rating_history_batch, commit=False)
+                
+                if product_details_batch:
+                    db.insert_product_details_batch(product_details_batch, commit=False)
+        except Exception as e:
+            logger.error(f"Batch insert failed: {e}")
+            raise
+        
+        existing_sellers.update(new_sellers)
+        
+        for batch in (products_batch, sellers_batch, price_history_batch,
+                      sales_history_batch, rating_history_batch, product_details_batch):
+            batch.clear()
+    
     for product in all_products:
         if not product.get('success'):
             failed += 1
@@ -121,23 +174,23 @@ def process_and_store_products_batch(results: dict, db: DatabaseV2, logger,
             seller_info = details.get('seller_info_enriched', {})
             seller_id = seller_info.get('id')
             if seller_id and seller_id not in existing_sellers and seller_id not in new_sellers:
-                sellers_batch.append({
-                    'seller_id': seller_id,
-                    'seller_name': seller_info.get('name'),
-                    'seller_url': seller_info.get('link'),
-                    'seller_total_follower': seller_info.get('total_follower')
-                })
+                sellers_batch.append(SellerRow(
+                    seller_id,
+                    seller_info.get('name'),
+                    seller_info.get('link'),
+                    seller_info.get('total_follower')
+                ))
                 new_sellers.add(seller_id)
             
             # Collect product data
-            products_batch.append({
-                'id': product_id,
-                'name': details.get('name'),
-                'short_description': details.get('short_description'),
-                'url_key': details.get('url_key'),
-                'category_id': category_id,
-                'category_name': category_name
-            })
+            products_batch.append(ProductRow(
+                product_id,
+                details.get('name'),
+                details.get('short_description'),
+                details.get('url_key'),
+                category_id,
+                category_name
+            ))
             
             if is_new_product:
                 new_product_ids.add(product_id)
@@ -146,40 +199,40 @@ def process_and_store_products_batch(results: dict, db: DatabaseV2, logger,
                 updated_products += 1
             
             # Collect history data (always add new records)
-            price_history_batch.append({
-                'product_id': product_id,
-                'price': details.get('price'),
-                'original_price': details.get('original_price'),
-                'discount': details.get('discount'),
-                'discount_rate': details.get('discount_rate'),
-                'crawl_timestamp': crawl_timestamp
-            })
+            price_history_batch.append(PriceHistoryRow(
+                product_id,
+                details.get('price'),
+                details.get('original_price'),
+                details.get('discount'),
+                details.get('discount_rate'),
+                crawl_timestamp
+            ))
             
-            sales_history_batch.append({
-                'product_id': product_id,
-                'quantity_sold': details.get('quantity_sold', {}).get('value', 0),
-                'all_time_quantity_sold': details.get('all_time_quantity_sold', 0),
-                'crawl_timestamp': crawl_timestamp
-            })
+            sales_history_batch.append(SalesHistoryRow(
+                product_id,
+                details.get('quantity_sold', {}).get('value', 0),
+                details.get('all_time_quantity_sold', 0),
+                crawl_timestamp
+            ))
             
-            rating_history_batch.append({
-                'product_id': product_id,
-                'rating_average': details.get('rating_average'),
-                'review_count': details.get('review_count'),
-                'crawl_timestamp': crawl_timestamp
-            })
+            rating_history_batch.append(RatingHistoryRow(
+                product_id,
+                details.get('rating_average'),
+                details.get('review_count'),
+                crawl_timestamp
+            ))
             
             # Product details
             brand = details.get('brand')
             badges = details.get('badges_v3') or details.get('badges', [])
             
-            product_details_batch.append({
-                'product_id': product_id,
-                'brand': json.dumps(brand, ensure_ascii=False) if brand else None,
-                'badges': json.dumps(badges, ensure_ascii=False) if badges else None,
-                'seller_id': seller_id,
-                'crawl_timestamp': crawl_timestamp
-            })
+            product_details_batch.append(ProductDetailsRow(
+                product_id,
+                orjson.dumps(brand).decode() if brand else None,
+                orjson.dumps(badges).decode() if badges else None,
+                seller_id,
+                crawl_timestamp
+            ))
             
             existing_products.add(product_id)
             successful += 1
@@ -187,33 +240,13 @@ def process_and_store_products_batch(results: dict, db: DatabaseV2, logger,
         except Exception as e:
             logger.error(f"Failed to process product {product.get('product_id')}: {e}")
             failed += 1
-    
-    # Batch insert
-    try:
-        if sellers_batch:
-            db.insert_sellers_batch(sellers_batch)
-            existing_sellers.update(new_sellers)
-        
-        if products_batch:
-            db.insert_products_batch(products_batch)
-        
-        if price_history_batch:
-            db.insert_price_history_batch(price_history_batch)
-        
-        if sales_history_batch:
-            db.insert_sales_history_batch(sales_history_batch)
         
-        if rating_history_batch:
-            db.insert_rating_history_batch(rating_history_batch)
-        
-        if product_details_batch:
-            db.insert_product_details_batch(product_details_batch)
-        
-        logger.info(f"  Batch inserted: {successful} products ({new_products} new, {updated_products} updated), {len(new_sellers)} sellers")
-        
-    except Exception as e:
-        logger.error(f"Batch insert failed: {e}")
-        raise
+        if len(products_batch) >= BATCH_SIZE:
+            flush_batches()
+    
+    # Insert whatever is left after the last full chunk
+    flush_batches()
+    logger.info(f"  Batch inserted: {successful} products ({new_products} new, {updated_products} updated), {len(new_sellers)} sellers")
     
     return successful, failed, new_products, updated_products
 
@@ -236,6 +269,7 @@ def update_database_from_all_json(json_files: list, db_path: str, logger):
     
     # Initialize database
     db = DatabaseV2(db_path)
+    db.configure_bulk_load()
     
     # Load existing data
     logger.info("Loading existing data from database...")
@@ -5,16 +5,32 @@ Uses ThreadPoolExecutor for concurrent crawling
 
 import requests
 import json
+import orjson
 import time
 import random
+import math
 from typing import List, Dict, Any, Optional
 import logging
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
+from queue import Queue
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+# Product API fields read downstream (build_db / update_db / DatabaseV2);
+# everything else (images, descriptions, configurable options, ...) is dropped
+PRODUCT_KEEP_KEYS = (
+    'id', 'name', 'short_description', 'url_key',
+    'price', 'original_price', 'discount', 'discount_rate',
+    'quantity_sold', 'all_time_quantity_sold',
+    'rating_average', 'review_count',
+    'brand', 'authors', 'badges', 'badges_v3',
+    'categories', 'specifications', 'current_seller'
+)
+
 
 class TikiParallelCrawler:
     """Parallel crawler for multiple categories with concurrent requests"""
@@ -28,6 +44,7 @@ class TikiParallelCrawler:
         self.request_delay = self.api_config.get('request_delay', 1)
         self.max_retries = self.api_config.get('max_retries', 3)
         self.timeout = self.api_config.get('timeout', 30)
+        self.keep_full_product = self.crawler_config.get('keep_full_product', False)  # Store the whole product JSON
         
         # Parallel config
         self.max_workers = self.crawler_config.get('max_workers', 10)  # Number of parallel workers
@@ -35,9 +52,37 @@ class TikiParallelCrawler:
         
         # Thread-safe session and counters
         self.session = requests.Session()
+        # Retries with exponential backoff (honouring Retry-After on 429) are done by
+        # urllib3; max_retries keeps its meaning of total attempts per request
+        retry = Retry(
+            total=max(self.max_retries - 1, 0),
+            backoff_factor=self.request_delay,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=['GET'],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        # Keep-alive pool large enough for every worker, otherwise connections
+        # beyond the default pool size (10) are dropped and re-handshaked
+        adapter = HTTPAdapter(
+            pool_connections=self.max_workers,
+            pool_maxsize=self.max_workers * 2,
+            max_retries=retry
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.stats_lock = Lock()
-        self.request_times = []  # Track request times for rate limiting
-        self.request_times_lock = Lock()
+        # Token bucket for rate limiting; it holds a single token so requests are
+        # spread evenly (1 / rate_limit_per_second apart) instead of bursting
+        self.rate_limit_tokens = 1.0
+        self.rate_limit_last_refill = time.monotonic()
+        self.rate_limit_lock = Lock()
+        
+        # Seller follower cache (seller_id -> (total_follower, fetched_at)),
+        # sellers repeat across many products of a category
+        self.seller_follower_cache = {}
+        self.seller_cache_lock = Lock()
+        self.seller_cache_ttl = self.crawler_config.get('seller_cache_ttl', 600)  # Retry failed lookups after this many seconds
         
         self.load_categories()
         
@@ -47,8 +92,8 @@ class TikiParallelCrawler:
         """Load categories from config file"""
         categories_file = self.crawler_config.get('categories_file', 'config/categories.json')
         try:
-            with open(categories_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(categories_file, 'rb') as f:
+                data = orjson.loads(f.read())
                 self.categories = data.get('categories', [])
             logger.info(f"Loaded {len(self.categories)} categories")
         except Exception as e:
@@ -68,63 +113,78 @@ class TikiParallelCrawler:
         }
     
     def _rate_limit(self):
-        """Smart rate limiting - ensure we don't exceed rate limit"""
-        with self.request_times_lock:
-            current_time = time.time()
-            
-            # Remove old request times (older than 1 second)
-            self.request_times = [t for t in self.request_times if current_time - t < 1.0]
+        """Token-bucket rate limiting - at most rate_limit_per_second requests per second"""
+        # rate_limit_per_second of 0/None disables limiting: skip the lock entirely
+        if not self.rate_limit_per_second:
+            return
+        
+        with self.rate_limit_lock:
+            current_time = time.monotonic()
             
-            # If we've hit the rate limit, wait
-            if len(self.request_times) >= self.rate_limit_per_second:
-                sleep_time = 1.0 - (current_time - self.request_times[0])
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                # Clean old times again
-                current_time = time.time()
-                self.request_times = [t for t in self.request_times if current_time - t < 1.0]
+            # Refill for the time elapsed since the last call (bucket capacity is one token)
+            elapsed = current_time - self.rate_limit_last_refill
+            self.rate_limit_tokens = min(1.0, self.rate_limit_tokens + elapsed * self.rate_limit_per_second)
+            self.rate_limit_last_refill = current_time
             
-            # Record this request
-            self.request_times.append(time.time())
+            # Take a token; if the bucket is empty the token is borrowed and we wait for it
+            self.rate_limit_tokens -= 1
+            sleep_time = -self.rate_limit_tokens / self.rate_limit_per_second
+        
+        # Sleep outside the lock so other workers can reserve their slots meanwhile
+        if sleep_time > 0:
+            time.sleep(sleep_time)
     
     def _make_request(self, url: str, params: Optional[Dict] = None) -> Optional[requests.Response]:
-        """Make HTTP request with retry logic and rate limiting"""
-        for attempt in range(self.max_retries):
-            try:
-                # Rate limiting
-                self._rate_limit()
-                
-                # Small random delay to spread requests
-                time.sleep(random.uniform(0.1, 0.3))
-                
-                response = self.session.get(
-                    url,
-                    headers=self._get_headers(),
-                    params=params,
-                    timeout=self.timeout
-                )
-                
-                if response.status_code == 200:
-                    return response
-                elif response.status_code == 429:
-                    wait_time = (2 ** attempt) * self.request_delay
-                    logger.warning(f"Rate limited, waiting {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    logger.warning(f"Request failed with status {response.status_code}")
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request error (attempt {attempt + 1}/{self.max_retries}): {e}")
-                if attempt < self.max_retries - 1:
-                    wait_time = (2 ** attempt) * self.request_delay
-                    time.sleep(wait_time)
+        """Make rate-limited HTTP request (retry/backoff handled by the session adapter)"""
+        # Rate limiting
+        self._rate_limit()
+        
+        try:
+            response = self.session.get(
+                url,
+                headers=self._get_headers(),
+                params=params,
+                timeout=self.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request error after {self.max_retries} attempts: {e}")
+            return None
+        
+        if response.status_code == 200:
+            return response
         
+        logger.warning(f"Request failed with status {response.status_code}")
         return None
     
+    def _fetch_listing_page(self, listing_api: str, category_id: int, page: int,
+                            products_per_page: int) -> Optional[Dict[str, Any]]:
+        """Fetch and parse one listing page (None on failure)"""
+        params = {
+            'limit': products_per_page,
+            'category': category_id,
+            'page': page,
+            'aggregations': 2
+        }
+        
+        response = self._make_request(listing_api, params=params)
+        
+        if not response:
+            logger.error(f"Failed to fetch page {page}")
+            return None
+        
+        try:
+            return orjson.loads(response.content)
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing page {page}: {e}")
+            return None
+    
     def get_product_ids_for_category(self, category_id: int, max_products: int = 250) -> List[str]:
         """
         Crawl product IDs for a specific category
         
+        Page 1 is fetched first to learn last_page; the remaining pages needed to
+        reach max_products are then fetched concurrently (still rate limited).
+        
         Args:
             category_id: Tiki category ID
             max_products: Maximum number of products to crawl
@@ -133,59 +193,82 @@ class TikiParallelCrawler:
             List of product IDs
         """
         product_ids = []
-        page = 1
         listing_api = self.api_config.get('listing_api', 'https://tiki.vn/api/v2/products')
         products_per_page = self.crawler_config.get('products_per_page', 48)
         
         logger.info(f"Crawling category {category_id}, max {max_products} products...")
         
-        while len(product_ids) < max_products:
-            params = {
-                'limit': products_per_page,
-                'category': category_id,
-                'page': page,
-                'aggregations': 2
-            }
-            
-            response = self._make_request(listing_api, params=params)
+        def collect(data: Optional[Dict[str, Any]]) -> bool:
+            """Add product IDs from a page, return False when pagination should stop"""
+            if not data:
+                return False
             
-            if not response:
-                logger.error(f"Failed to fetch page {page}")
-                break
+            products = data.get('data', [])
+            if not products:
+                return False
             
-            try:
-                data = response.json()
-                products = data.get('data', [])
+            for product in products:
+                if len(product_ids) >= max_products:
+                    return False
                 
-                if not products:
-                    break
-                
-                for product in products:
-                    if len(product_ids) >= max_products:
-                        break
-                    
-                    product_id = str(product.get('id'))
-                    if product_id:
-                        product_ids.append(product_id)
+                product_id = str(product.get('id'))
+                if product_id:
+                    product_ids.append(product_id)
+            
+            return len(product_ids) < max_products
+        
+        first_page = self._fetch_listing_page(listing_api, category_id, 1, products_per_page)
+        
+        if collect(first_page):
+            # Check pagination
+            paging = first_page.get('paging', {})
+            last_page = paging.get('last_page', 1)
+            page = paging.get('current_page', 1) + 1
+            
+            while page <= last_page:
+                # Only request as many pages as are needed for the remaining products
+                remaining = max_products - len(product_ids)
+                batch_end = min(last_page, page - 1 + math.ceil(remaining / products_per_page))
+                batch = range(page, batch_end + 1)
                 
-                # Check pagination
-                paging = data.get('paging', {})
-                current_page = paging.get('current_page', page)
-                last_page = paging.get('last_page', page)
+                with ThreadPoolExecutor(max_workers=min(len(batch), self.max_workers)) as executor:
+                    pages = list(executor.map(
+                        lambda p: self._fetch_listing_page(listing_api, category_id, p, products_per_page),
+                        batch
+                    ))
                 
-                if current_page >= last_page:
+                # Consume pages in order, stopping at the first failed or empty page
+                if not all(collect(data) for data in pages):
                     break
                 
-                page += 1
-                
-            except (json.JSONDecodeError, KeyError) as e:
-                logger.error(f"Error parsing page {page}: {e}")
-                break
+                page = batch_end + 1
         
         logger.info(f"Collected {len(product_ids)} products for category {category_id}")
         return product_ids
     
     def get_seller_follower_info(self, seller_id: int) -> Optional[int]:
+        """
+        Get seller follower count (cached per seller)
+        
+        Successful lookups are reused for the whole crawl; failed lookups (None)
+        are only reused for seller_cache_ttl seconds so transient errors are retried.
+        """
+        with self.seller_cache_lock:
+            cached = self.seller_follower_cache.get(seller_id)
+        
+        if cached:
+            total_follower, fetched_at = cached
+            if total_follower is not None or time.time() - fetched_at < self.seller_cache_ttl:
+                return total_follower
+        
+        total_follower = self._fetch_seller_follower_info(seller_id)
+        
+        with self.seller_cache_lock:
+            self.seller_follower_cache[seller_id] = (total_follower, time.time())
+        
+        return total_follower
+    
+    def _fetch_seller_follower_info(self, seller_id: int) -> Optional[int]:
         """Get seller follower count from social API"""
         url = "https://api.tiki.vn/social/openapi/interaction/following"
         params = {'tiki_seller_id': seller_id}
@@ -196,7 +279,7 @@ class TikiParallelCrawler:
             return None
         
         try:
-            data = response.json()
+            data = orjson.loads(response.content)
             follower_info = data.get('data', {}).get('following', {})
             total_follower = follower_info.get('total_follower', 0)
             return total_follower
@@ -208,6 +291,9 @@ class TikiParallelCrawler:
         """
         Get product details (with seller follower info)
         
+        Only PRODUCT_KEEP_KEYS are kept unless crawler.keep_full_product is set,
+        which shrinks every product before it is queued and written to disk.
+        
         Returns enriched product data
         """
         url = self.api_config.get('product_api', 'https://tiki.vn/api/v2/products/{}').format(product_id)
@@ -217,7 +303,9 @@ class TikiParallelCrawler:
             return None
         
         try:
-            data = response.json()
+            data = orjson.loads(response.content)
+            if not self.keep_full_product:
+                data = {key: data[key] for key in PRODUCT_KEEP_KEYS if key in data}
             
             # Extract seller info
             seller_info = data.get('current_seller', {})
@@ -258,7 +346,8 @@ class TikiParallelCrawler:
         Returns:
             Product data dictionary
         """
-        logger.info(f"[{idx}/{total}] Crawling product {product_id}...")
+        # Per-product progress is DEBUG-only; %-style args are not formatted when disabled
+        logger.debug("[%d/%d] Crawling product %s...", idx, total, product_id)
         
         details = self.get_product_details(product_id)
         if details:
@@ -277,10 +366,16 @@ class TikiParallelCrawler:
                 'category_name': category_name
             }
     
-    def crawl_category_parallel(self, category: Dict[str, Any]) -> Dict[str, Any]:
+    def crawl_category_parallel(self, category: Dict[str, Any],
+                                result_queue: Optional[Queue] = None) -> Dict[str, Any]:
         """
         Crawl a single category using parallel workers
         
+        Args:
+            category: Category dict (id, name)
+            result_queue: If given, every product result is put on this queue as soon
+                as it completes instead of being collected in 'products'
+        
         Returns:
             Dictionary with products and stats
         """
@@ -300,6 +395,8 @@ class TikiParallelCrawler:
         
         # Crawl products in parallel
         products = []
+        successful = 0
+        failed = 0
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             # Submit all tasks
             futures = {
@@ -318,17 +415,25 @@ class TikiParallelCrawler:
             for future in as_completed(futures):
                 try:
                     result = future.result()
-                    products.append(result)
                 except Exception as e:
                     product_id = futures[future]
                     logger.error(f"Error crawling product {product_id}: {e}")
-                    products.append({
+                    result = {
                         'product_id': product_id,
                         'success': False,
                         'category_id': category_id,
                         'category_name': category_name,
                         'error': str(e)
-                    })
+                    }
+                if result['success']:
+                    successful += 1
+                else:
+                    failed += 1
+                
+                if result_queue is not None:
+                    result_queue.put(result)
+                else:
+                    products.append(result)
         
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
@@ -339,8 +444,8 @@ class TikiParallelCrawler:
             'products': products,
             'stats': {
                 'total': len(product_ids),
-                'successful': len([p for p in products if p['success']]),
-                'failed': len([p for p in products if not p['success']]),
+                'successful': successful,
+                'failed': failed,
                 'duration': duration,
                 'products_per_second': len(product_ids) / duration if duration > 0 else 0
             }
@@ -352,10 +457,15 @@ class TikiParallelCrawler:
         
         return result
     
-    def crawl_all_categories_parallel(self) -> Dict[str, Any]:
+    def crawl_all_categories_parallel(self, result_queue: Optional[Queue] = None) -> Dict[str, Any]:
         """
         Crawl all categories (each category crawled with parallel workers)
         
+        Args:
+            result_queue: If given, product results are handed to this queue as they
+                complete (so a consumer can write them while crawling continues)
+                and are not collected in all_products
+        
         Returns:
             Complete results with all products
         """
@@ -381,11 +491,16 @@ class TikiParallelCrawler:
         for idx, category in enumerate(self.categories, 1):
             logger.info(f"\n[CATEGORY {idx}/{len(self.categories)}]")
             
-            result = self.crawl_category_parallel(category)
+            result = self.crawl_category_parallel(category, result_queue)
+            
+            # Keep each product once: categories only keep their stats, products go
+            # to all_products (or were already handed to the consumer when streaming)
+            products = result.pop('products')
             all_results['categories'].append(result)
             
             # Aggregate products
-            all_results['all_products'].extend(result['products'])
+            if result_queue is None:
+                all_results['all_products'].extend(products)
             all_results['stats']['total_products'] += result['stats']['total']
             all_results['stats']['successful_products'] += result['stats']['successful']
             all_results['stats']['failed_products'] += result['stats']['failed']
@@ -8,39 +8,144 @@ Updated database module (V2) - Optimized schema
 
 import sqlite3
 import json
+import orjson
+from collections import namedtuple
+from itertools import chain
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import logging
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
 
+# Bound parameters per statement (SQLITE_MAX_VARIABLE_NUMBER on SQLite < 3.32)
+SQLITE_MAX_VARIABLES = 999
+
+# Default memory-mapped I/O size for bulk loads (1 GiB); SQLite caps it at the
+# file size and its compile-time SQLITE_MAX_MMAP_SIZE
+BULK_LOAD_MMAP_SIZE = 1 << 30
+
+# Upsert clause for products: update in place instead of the DELETE + INSERT of OR REPLACE,
+# which also reset created_at to the time of the latest crawl
+PRODUCT_UPSERT_SQL = """
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name,
+        short_description = excluded.short_description,
+        url_key = excluded.url_key,
+        category_id = excluded.category_id,
+        category_name = excluded.category_name
+"""
+
+# Row tuples for the *_batch inserts, fields in the same order as the INSERT columns
+SellerRow = namedtuple('SellerRow', 'seller_id seller_name seller_url seller_total_follower')
+ProductRow = namedtuple('ProductRow', 'id name short_description url_key category_id category_name')
+PriceHistoryRow = namedtuple('PriceHistoryRow', 'product_id price original_price discount discount_rate crawl_timestamp')
+SalesHistoryRow = namedtuple('SalesHistoryRow', 'product_id quantity_sold all_time_quantity_sold crawl_timestamp')
+RatingHistoryRow = namedtuple('RatingHistoryRow', 'product_id rating_average review_count crawl_timestamp')
+ProductDetailsRow = namedtuple('ProductDetailsRow', 'product_id brand badges seller_id crawl_timestamp')
+
+
 class DatabaseV2:
     """Updated database with optimized schema"""
     
-    def __init__(self, db_path: str):
-        """Initialize database"""
+    def __init__(self, db_path: str, tune_pragmas: bool = True):
+        """
+        Initialize database
+        
+        Args:
+            db_path: SQLite file path
+            tune_pragmas: Apply the WAL/cache PRAGMAs in connect(); pass False to
+                keep SQLite defaults (rollback journal, synchronous=FULL)
+        """
         self.db_path = db_path
+        self.tune_pragmas = tune_pragmas
         self.conn = None
         self.connect()
         self.create_tables()
+        self.create_indexes()
     
     def connect(self):
         """Establish database connection"""
         try:
             self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
             self.conn.row_factory = sqlite3.Row
+            
+            # WAL lets readers (exports, notebooks) run while a writer commits, and
+            # synchronous=NORMAL drops the fsync per commit (still crash-safe in WAL).
+            # Local disks only: on network filesystems use locking_mode=EXCLUSIVE instead.
+            if self.tune_pragmas:
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.execute("PRAGMA synchronous=NORMAL")
+                self.conn.execute("PRAGMA temp_store=MEMORY")
+                self.conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+                self.conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB memory-mapped reads
             logger.info(f"Connected to database: {self.db_path}")
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
     
+    def configure_bulk_load(self, mmap_size: int = BULK_LOAD_MMAP_SIZE):
+        """
+        Tune the connection for large imports (build_db, update_db)
+        
+        On top of the settings applied in connect(), a larger page cache plus
+        memory-mapped I/O keeps index pages in RAM, and checkpointing less often
+        lets the WAL absorb big batches. Does nothing when the database was
+        opened with tune_pragmas=False.
+        
+        Args:
+            mmap_size: Bytes of the database file to memory-map (0 disables mmap)
+        """
+        if not self.tune_pragmas:
+            return
+        
+        pragmas = [
+            'cache_size=-262144',  # 256 MiB page cache
+            f'mmap_size={int(mmap_size)}',
+            'wal_autocheckpoint=10000'
+        ]
+        for pragma in pragmas:
+            self.conn.execute(f"PRAGMA {pragma}")
+        logger.info("Bulk load PRAGMAs applied (cache_size, mmap_size, wal_autocheckpoint)")
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Group several writes into a single transaction (one commit per block)
+        
+        Hot loops and batch helpers should wrap their inserts in
+        `with db.transaction():` and pass commit=False to the insert_* /
+        *_batch methods called inside; the block commits once on success and
+        rolls everything back on error. BEGIN IMMEDIATE takes the write lock up
+        front so the transaction never has to upgrade from a read lock.
+        
+        A block opened while a transaction is already active joins it: only
+        the outermost block commits or rolls back.
+        """
+        began = not self.conn.in_transaction
+        if began:
+            self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+            if began:
+                self.conn.commit()
+        except Exception:
+            if began:
+                self.conn.rollback()
+            raise
+    
     def create_tables(self):
-        """Create optimized tables"""
-        cursor = self.conn.cursor()
+        """
+        Create optimized tables
         
-        # Products table
-        cursor.execute("""
+        All DDL runs as one executescript() inside a single transaction, so the
+        schema is created atomically in one call instead of one execute() per table.
+        """
+        self.conn.executescript("""
+            BEGIN;
+            
+            -- Products table
             CREATE TABLE IF NOT EXISTS products (
                 id INTEGER PRIMARY KEY,
                 name TEXT NOT NULL,
@@ -49,13 +154,11 @@ class DatabaseV2:
                 category_id INTEGER,
                 category_name TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Price history
-        cursor.execute("""
+            );
+            
+            -- Price history
             CREATE TABLE IF NOT EXISTS price_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id INTEGER PRIMARY KEY,
                 product_id INTEGER NOT NULL,
                 price REAL NOT NULL,
                 original_price REAL,
@@ -63,37 +166,31 @@ class DatabaseV2:
                 discount_rate INTEGER,
                 crawl_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (product_id) REFERENCES products(id)
-            )
-        """)
-        
-        # Sales history (REMOVED inventory_status)
-        cursor.execute("""
+            );
+            
+            -- Sales history (REMOVED inventory_status)
             CREATE TABLE IF NOT EXISTS sales_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id INTEGER PRIMARY KEY,
                 product_id INTEGER NOT NULL,
                 quantity_sold INTEGER NOT NULL,
                 all_time_quantity_sold INTEGER,
                 crawl_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (product_id) REFERENCES products(id)
-            )
-        """)
-        
-        # Rating history (REMOVED ratings_distribution, favourite_count, KEPT review_count)
-        cursor.execute("""
+            );
+            
+            -- Rating history (REMOVED ratings_distribution, favourite_count, KEPT review_count)
             CREATE TABLE IF NOT EXISTS rating_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id INTEGER PRIMARY KEY,
                 product_id INTEGER NOT NULL,
                 rating_average REAL,
                 review_count INTEGER,
                 crawl_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (product_id) REFERENCES products(id)
-            )
-        """)
-        
-        # Product details (REMOVED promotions, seller_rating, seller_review_count)
-        cursor.execute("""
+            );
+            
+            -- Product details (REMOVED promotions, seller_rating, seller_review_count)
             CREATE TABLE IF NOT EXISTS product_details (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id INTEGER PRIMARY KEY,
                 product_id INTEGER NOT NULL,
                 brand TEXT,
                 categories TEXT,
@@ -103,24 +200,20 @@ class DatabaseV2:
                 crawl_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (product_id) REFERENCES products(id),
                 FOREIGN KEY (seller_id) REFERENCES sellers(seller_id)
-            )
-        """)
-        
-        # Sellers table (NEW)
-        cursor.execute("""
+            );
+            
+            -- Sellers table (NEW)
             CREATE TABLE IF NOT EXISTS sellers (
                 seller_id INTEGER PRIMARY KEY,
                 seller_name TEXT,
                 seller_url TEXT,
                 seller_total_follower INTEGER,
                 last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Crawl logs
-        cursor.execute("""
+            );
+            
+            -- Crawl logs
             CREATE TABLE IF NOT EXISTS crawl_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id INTEGER PRIMARY KEY,
                 crawl_type TEXT NOT NULL,
                 start_time TIMESTAMP NOT NULL,
                 end_time TIMESTAMP,
@@ -129,38 +222,61 @@ class DatabaseV2:
                 status TEXT,
                 error_message TEXT,
                 categories_crawled TEXT
-            )
+            );
+            
+            COMMIT;
         """)
-        
-        # Create indexes
-        cursor.execute("""
+        logger.info("Database tables created successfully (V2 schema)")
+    
+    def create_indexes(self):
+        """Create secondary indexes (no-op if they already exist)"""
+        self.conn.executescript("""
+            BEGIN;
+            
             CREATE INDEX IF NOT EXISTS idx_price_history_product 
-            ON price_history(product_id, crawl_timestamp)
-        """)
-        
-        cursor.execute("""
+            ON price_history(product_id, crawl_timestamp);
+            
             CREATE INDEX IF NOT EXISTS idx_sales_history_product 
-            ON sales_history(product_id, crawl_timestamp)
-        """)
-        
-        cursor.execute("""
+            ON sales_history(product_id, crawl_timestamp);
+            
             CREATE INDEX IF NOT EXISTS idx_products_category 
-            ON products(category_id)
+            ON products(category_id);
+            
+            -- Latest-rating lookups in the exporter (same shape as price/sales)
+            CREATE INDEX IF NOT EXISTS idx_rating_history_product 
+            ON rating_history(product_id, crawl_timestamp);
+            
+            -- products -> product_details -> sellers joins; seller_id makes it covering for the seller join
+            CREATE INDEX IF NOT EXISTS idx_product_details_product 
+            ON product_details(product_id, seller_id);
+            
+            COMMIT;
         """)
+    
+    def drop_indexes(self):
+        """
+        Drop secondary indexes before a bulk load
         
+        Rows are then appended without per-row B-tree maintenance; call
+        create_indexes() afterwards to build each index once in a single pass.
+        """
+        cursor = self.conn.cursor()
+        for index_name in ('idx_price_history_product', 'idx_sales_history_product',
+                           'idx_products_category', 'idx_rating_history_product',
+                           'idx_product_details_product'):
+            cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
         self.conn.commit()
-        logger.info("Database tables created successfully (V2 schema)")
     
     def insert_product(self, product_data: Dict[str, Any], category_id: int = None, 
-                      category_name: str = None) -> bool:
+                      category_name: str = None, commit: bool = True) -> bool:
         """Insert or update product"""
         try:
             cursor = self.conn.cursor()
             cursor.execute("""
-                INSERT OR REPLACE INTO products 
+                INSERT INTO products 
                 (id, name, short_description, url_key, category_id, category_name)
                 VALUES (?, ?, ?, ?, ?, ?)
-            """, (
+            """ + PRODUCT_UPSERT_SQL, (
                 product_data.get('id'),
                 product_data.get('name'),
                 product_data.get('short_description'),
@@ -168,14 +284,15 @@ class DatabaseV2:
                 category_id,
                 category_name
             ))
-            self.conn.commit()
+            if commit:
+                self.conn.commit()
             return True
         except Exception as e:
             logger.error(f"Failed to insert product: {e}")
             return False
     
     def insert_price_history(self, product_id: int, price_data: Dict[str, Any], 
-                            crawl_timestamp: Optional[str] = None) -> bool:
+                            crawl_timestamp: Optional[str] = None, commit: bool = True) -> bool:
         """Insert price history"""
         try:
             cursor = self.conn.cursor()
@@ -204,14 +321,15 @@ class DatabaseV2:
                     price_data.get('discount'),
                     price_data.get('discount_rate')
                 ))
-            self.conn.commit()
+            if commit:
+                self.conn.commit()
             return True
         except Exception as e:
             logger.error(f"Failed to insert price history: {e}")
             return False
     
     def insert_sales_history(self, product_id: int, sales_data: Dict[str, Any],
-                            crawl_timestamp: Optional[str] = None) -> bool:
+                            crawl_timestamp: Optional[str] = None, commit: bool = True) -> bool:
         """Insert sales history (NO inventory_status)"""
         try:
             cursor = self.conn.cursor()
@@ -236,14 +354,15 @@ class DatabaseV2:
                     sales_data.get('quantity_sold', 0),
                     sales_data.get('all_time_quantity_sold')
                 ))
-            self.conn.commit()
+            if commit:
+                self.conn.commit()
             return True
         except Exception as e:
             logger.error(f"Failed to insert sales history: {e}")
             return False
     
     def insert_rating_history(self, product_id: int, rating_data: Dict[str, Any],
-                               crawl_timestamp: Optional[str] = None) -> bool:
+                               crawl_timestamp: Optional[str] = None, commit: bool = True) -> bool:
         """Insert rating history (NO ratings_distribution, favourite_count, YES review_count)"""
         try:
             cursor = self.conn.cursor()
@@ -268,14 +387,15 @@ class DatabaseV2:
                     rating_data.get('rating_average'),
                     rating_data.get('review_count')
                 ))
-            self.conn.commit()
+            if commit:
+                self.conn.commit()
             return True
         except Exception as e:
             logger.error(f"Failed to insert rating history: {e}")
             return False
     
     def insert_product_details(self, product_id: int, details: Dict[str, Any],
-                               crawl_timestamp: Optional[str] = None) -> bool:
+                               crawl_timestamp: Optional[str] = None, commit: bool = True) -> bool:
         """Insert product details (REMOVED promotions, seller_rating, seller_review_count)"""
         try:
             cursor = self.conn.cursor()
@@ -294,6 +414,12 @@ class DatabaseV2:
             # Use badges_v3 instead of badges
             badges_data = details.get('badges_v3') or details.get('badges', [])
             
+            # JSON columns serialized once with orjson (compact UTF-8, same as the batch imports)
+            brand_json = orjson.dumps(brand_data).decode() if brand_data else None
+            categories_json = orjson.dumps(details.get('categories', {})).decode()
+            specifications_json = orjson.dumps(details.get('specifications', [])).decode()
+            badges_json = orjson.dumps(badges_data).decode()
+            
             if crawl_timestamp:
                 cursor.execute("""
                     INSERT INTO product_details 
@@ -301,10 +427,10 @@ class DatabaseV2:
                     VALUES (?, ?, ?, ?, ?, ?, ?)
                 """, (
                     product_id,
-                    json.dumps(brand_data, ensure_ascii=False) if brand_data else None,
-                    json.dumps(details.get('categories', {}), ensure_ascii=False),
-                    json.dumps(details.get('specifications', []), ensure_ascii=False),
-                    json.dumps(badges_data, ensure_ascii=False),
+                    brand_json,
+                    categories_json,
+                    specifications_json,
+                    badges_json,
                     seller_info.get('id'),
                     crawl_timestamp
                 ))
@@ -315,39 +441,92 @@ class DatabaseV2:
                     VALUES (?, ?, ?, ?, ?, ?)
                 """, (
                     product_id,
-                    json.dumps(brand_data, ensure_ascii=False) if brand_data else None,
-                    json.dumps(details.get('categories', {}), ensure_ascii=False),
-                    json.dumps(details.get('specifications', []), ensure_ascii=False),
-                    json.dumps(badges_data, ensure_ascii=False),
+                    brand_json,
+                    categories_json,
+                    specifications_json,
+                    badges_json,
                     seller_info.get('id')
                 ))
-            self.conn.commit()
+            if commit:
+                self.conn.commit()
             return True
         except Exception as e:
             logger.error(f"Failed to insert product details: {e}")
             return False
     
-    def insert_seller(self, seller_data: Dict[str, Any]) -> bool:
+    def insert_seller(self, seller_data: Dict[str, Any], commit: bool = True) -> bool:
         """Insert or update seller info"""
         try:
             cursor = self.conn.cursor()
             cursor.execute("""
-                INSERT OR REPLACE INTO sellers 
+                INSERT INTO sellers 
                 (seller_id, seller_name, seller_url, seller_total_follower, last_updated)
                 VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(seller_id) DO UPDATE SET
+                    seller_name = excluded.seller_name,
+                    seller_url = excluded.seller_url,
+                    seller_total_follower = excluded.seller_total_follower,
+                    last_updated = excluded.last_updated
             """, (
                 seller_data.get('seller_id'),
                 seller_data.get('seller_name'),
                 seller_data.get('seller_url'),
                 seller_data.get('seller_total_follower', 0)
             ))
-            self.conn.commit()
+            if commit:
+                self.conn.commit()
             return True
         except Exception as e:
             logger.error(f"Failed to insert seller: {e}")
             return False
     
-    def log_crawl(self, log_data: Dict[str, Any]) -> int:
+    def upsert_full_product(self, details: Dict[str, Any], category_id: int = None,
+                            category_name: str = None, crawl_timestamp: Optional[str] = None) -> bool:
+        """
+        Store one crawled product in a single transaction
+        
+        Writes the seller, product, price/sales/rating history and details rows
+        with one commit instead of one per table; if any insert fails, none of
+        the product's rows are kept.
+        
+        Args:
+            details: Product details as returned by the crawler (with seller_info_enriched)
+            category_id: Category ID
+            category_name: Category name
+            crawl_timestamp: Crawl start time (defaults to CURRENT_TIMESTAMP)
+        """
+        product_id = details.get('id')
+        seller_info = details.get('seller_info_enriched') or {}
+        sales_data = {
+            'quantity_sold': (details.get('quantity_sold') or {}).get('value', 0),
+            'all_time_quantity_sold': details.get('all_time_quantity_sold', 0)
+        }
+        
+        try:
+            with self.transaction():
+                stored = [
+                    self.insert_product(details, category_id, category_name, commit=False),
+                    self.insert_price_history(product_id, details, crawl_timestamp, commit=False),
+                    self.insert_sales_history(product_id, sales_data, crawl_timestamp, commit=False),
+                    self.insert_rating_history(product_id, details, crawl_timestamp, commit=False),
+                    self.insert_product_details(product_id, details, crawl_timestamp, commit=False)
+                ]
+                if seller_info.get('id'):
+                    stored.append(self.insert_seller({
+                        'seller_id': seller_info.get('id'),
+                        'seller_name': seller_info.get('name'),
+                        'seller_url': seller_info.get('link'),
+                        'seller_total_follower': seller_info.get('total_follower')
+                    }, commit=False))
+                
+                if not all(stored):
+                    raise sqlite3.DatabaseError(f"Failed to store all rows for product {product_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to upsert product {product_id}: {e}")
+            return False
+    
+    def log_crawl(self, log_data: Dict[str, Any], commit: bool = True) -> int:
         """Log crawl session"""
         try:
             cursor = self.conn.cursor()
@@ -371,7 +550,8 @@ class DatabaseV2:
                 log_data.get('error_message'),
                 categories_crawled
             ))
-            self.conn.commit()
+            if commit:
+                self.conn.commit()
             return cursor.lastrowid
         except Exception as e:
             logger.error(f"Failed to log crawl: {e}")
@@ -380,8 +560,10 @@ class DatabaseV2:
     def get_all_product_ids(self) -> List[int]:
         """Get all product IDs"""
         cursor = self.conn.cursor()
+        cursor.row_factory = None  # Plain tuples, no sqlite3.Row wrapper per row
         cursor.execute("SELECT id FROM products ORDER BY id")
-        return [row[0] for row in cursor.fetchall()]
+        # Iterate the cursor directly instead of materializing fetchall() first
+        return [row[0] for row in cursor]
     
     def get_products_by_category(self, category_id: int) -> List[Dict[str, Any]]:
         """Get products for a category"""
@@ -389,156 +571,129 @@ class DatabaseV2:
         cursor.execute("""
             SELECT * FROM products WHERE category_id = ? ORDER BY id
         """, (category_id,))
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        return [dict(row) for row in cursor]
+    
+    def _insert_values(self, cursor: sqlite3.Cursor, insert_sql: str, row_sql: str, rows: List[tuple],
+                       suffix_sql: str = ''):
+        """
+        Insert rows with multi-row VALUES statements
+        
+        Each statement carries as many rows as fit in SQLITE_MAX_VARIABLES, so SQLite
+        runs one statement per chunk instead of one VM step per row (executemany).
+        Full chunks reuse the same SQL text and therefore the cached statement.
+        suffix_sql (e.g. an ON CONFLICT clause) is appended after the VALUES list.
+        """
+        chunk_size = max(1, SQLITE_MAX_VARIABLES // len(rows[0]))
+        full_chunk_sql = insert_sql + ', '.join([row_sql] * chunk_size) + suffix_sql
+        
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            sql = full_chunk_sql if len(chunk) == chunk_size else insert_sql + ', '.join([row_sql] * len(chunk)) + suffix_sql
+            cursor.execute(sql, list(chain.from_iterable(chunk)))
     
-    def insert_sellers_batch(self, sellers_batch: List[Dict[str, Any]]):
-        """Batch insert sellers"""
+    def insert_sellers_batch(self, sellers_batch: List[SellerRow], commit: bool = True):
+        """
+        Batch insert sellers (first-seen info wins)
+        
+        INSERT OR IGNORE lets SQLite drop sellers that already exist instead of
+        the DELETE + re-INSERT that OR REPLACE performs on every conflict.
+        """
         if not sellers_batch:
             return
         try:
             cursor = self.conn.cursor()
-            cursor.executemany("""
-                INSERT OR REPLACE INTO sellers 
+            self._insert_values(cursor, """
+                INSERT OR IGNORE INTO sellers 
                 (seller_id, seller_name, seller_url, seller_total_follower, last_updated)
-                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """, [
-                (
-                    s.get('seller_id'),
-                    s.get('seller_name'),
-                    s.get('seller_url'),
-                    s.get('seller_total_follower', 0)
-                )
-                for s in sellers_batch
-            ])
-            self.conn.commit()
+                VALUES
+            """, '(?, ?, ?, ?, CURRENT_TIMESTAMP)', sellers_batch)
+            if commit:
+                self.conn.commit()
         except Exception as e:
             logger.error(f"Failed to batch insert sellers: {e}")
             raise
     
-    def insert_products_batch(self, products_batch: List[Dict[str, Any]]):
+    def insert_products_batch(self, products_batch: List[ProductRow], commit: bool = True):
         """Batch insert products"""
         if not products_batch:
             return
         try:
             cursor = self.conn.cursor()
-            cursor.executemany("""
-                INSERT OR REPLACE INTO products 
+            self._insert_values(cursor, """
+                INSERT INTO products 
                 (id, name, short_description, url_key, category_id, category_name)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, [
-                (
-                    p.get('id'),
-                    p.get('name'),
-                    p.get('short_description'),
-                    p.get('url_key'),
-                    p.get('category_id'),
-                    p.get('category_name')
-                )
-                for p in products_batch
-            ])
-            self.conn.commit()
+                VALUES
+            """, '(?, ?, ?, ?, ?, ?)', products_batch, PRODUCT_UPSERT_SQL)
+            if commit:
+                self.conn.commit()
         except Exception as e:
             logger.error(f"Failed to batch insert products: {e}")
             raise
     
-    def insert_price_history_batch(self, price_history_batch: List[Dict[str, Any]]):
+    def insert_price_history_batch(self, price_history_batch: List[PriceHistoryRow], commit: bool = True):
         """Batch insert price history"""
         if not price_history_batch:
             return
         try:
             cursor = self.conn.cursor()
-            cursor.executemany("""
+            self._insert_values(cursor, """
                 INSERT INTO price_history 
                 (product_id, price, original_price, discount, discount_rate, crawl_timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, [
-                (
-                    ph.get('product_id'),
-                    ph.get('price'),
-                    ph.get('original_price'),
-                    ph.get('discount'),
-                    ph.get('discount_rate'),
-                    ph.get('crawl_timestamp')
-                )
-                for ph in price_history_batch
-            ])
-            self.conn.commit()
+                VALUES
+            """, '(?, ?, ?, ?, ?, ?)', price_history_batch)
+            if commit:
+                self.conn.commit()
         except Exception as e:
             logger.error(f"Failed to batch insert price history: {e}")
             raise
     
-    def insert_sales_history_batch(self, sales_history_batch: List[Dict[str, Any]]):
+    def insert_sales_history_batch(self, sales_history_batch: List[SalesHistoryRow], commit: bool = True):
         """Batch insert sales history"""
         if not sales_history_batch:
             return
         try:
             cursor = self.conn.cursor()
-            cursor.executemany("""
+            self._insert_values(cursor, """
                 INSERT INTO sales_history 
                 (product_id, quantity_sold, all_time_quantity_sold, crawl_timestamp)
-                VALUES (?, ?, ?, ?)
-            """, [
-                (
-                    sh.get('product_id'),
-                    sh.get('quantity_sold', 0),
-                    sh.get('all_time_quantity_sold'),
-                    sh.get('crawl_timestamp')
-                )
-                for sh in sales_history_batch
-            ])
-            self.conn.commit()
+                VALUES
+            """, '(?, ?, ?, ?)', sales_history_batch)
+            if commit:
+                self.conn.commit()
         except Exception as e:
             logger.error(f"Failed to batch insert sales history: {e}")
             raise
     
-    def insert_rating_history_batch(self, rating_history_batch: List[Dict[str, Any]]):
+    def insert_rating_history_batch(self, rating_history_batch: List[RatingHistoryRow], commit: bool = True):
         """Batch insert rating history"""
         if not rating_history_batch:
             return
         try:
             cursor = self.conn.cursor()
-            cursor.executemany("""
+            self._insert_values(cursor, """
                 INSERT INTO rating_history 
                 (product_id, rating_average, review_count, crawl_timestamp)
-                VALUES (?, ?, ?, ?)
-            """, [
-                (
-                    rh.get('product_id'),
-                    rh.get('rating_average'),
-                    rh.get('review_count'),
-                    rh.get('crawl_timestamp')
-                )
-                for rh in rating_history_batch
-            ])
-            self.conn.commit()
+                VALUES
+            """, '(?, ?, ?, ?)', rating_history_batch)
+            if commit:
+                self.conn.commit()
         except Exception as e:
             logger.error(f"Failed to batch insert rating history: {e}")
             raise
     
-    def insert_product_details_batch(self, product_details_batch: List[Dict[str, Any]]):
-        """Batch insert product details"""
+    def insert_product_details_batch(self, product_details_batch: List[ProductDetailsRow], commit: bool = True):
+        """Batch insert product details (categories/specifications are not stored by batch imports)"""
         if not product_details_batch:
             return
         try:
             cursor = self.conn.cursor()
-            cursor.executemany("""
+            self._insert_values(cursor, """
                 INSERT INTO product_details 
-                (product_id, brand, categories, specifications, badges, seller_id, crawl_timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, [
-                (
-                    pd.get('product_id'),
-                    pd.get('brand'),
-                    None,  # categories - not used in current schema
-                    None,  # specifications - not used in current schema
-                    pd.get('badges'),
-                    pd.get('seller_id'),
-                    pd.get('crawl_timestamp')
-                )
-                for pd in product_details_batch
-            ])
-            self.conn.commit()
+                (product_id, brand, badges, seller_id, crawl_timestamp)
+                VALUES
+            """, '(?, ?, ?, ?, ?)', product_details_batch)
+            if commit:
+                self.conn.commit()
         except Exception as e:
             logger.error(f"Failed to batch insert product details: {e}")
             raise
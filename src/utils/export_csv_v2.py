@@ -4,46 +4,215 @@ Compatible with updated schema (no favourite_count, inventory_status, reviews)
 """
 
 import pandas as pd
-import json
+import csv
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 import logging
+import queue
 import sqlite3
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched and written per batch when streaming a query to CSV
+EXPORT_FETCH_SIZE = 10_000
+
+# Rows per DataFrame chunk for exports that compute derived columns
+EXPORT_CHUNK_SIZE = 50_000
+
+UTF8_BOM = b'\xef\xbb\xbf'
+
+# gzip level for *.csv.gz exports: fastest setting, still several times smaller than plain CSV
+GZIP_COMPRESSLEVEL = 1
+
+
+def write_chunks_from_queue(chunk_queue: queue.Queue, f, errors: list):
+    """
+    Writer thread: format DataFrame chunks from the queue as CSV into an open binary
+    file until the None sentinel arrives (header on the first chunk only)
+    """
+    first = True
+    while True:
+        df = chunk_queue.get()
+        if df is None:
+            break
+        if errors:
+            continue  # Keep draining so the reader never blocks on a full queue
+        
+        try:
+            # DataFrame.to_csv keeps the published format (minimal quoting, True/False,
+            # 1.0 for whole floats); column dtypes must be fixed by the caller so every
+            # chunk renders its numbers the same way
+            f.write(df.to_csv(index=False, header=first).encode('utf-8'))
+            first = False
+        except Exception as e:
+            errors.append(e)
+
 
 class CSVExporterV2:
     """Export DatabaseV2 data to CSV files"""
     
-    def __init__(self, db_path: str, output_dir: str = "data/exports"):
+    def __init__(self, db_path: str, output_dir: str = "data/exports", compress: bool = False):
         """
         Initialize CSV exporter
         
         Args:
             db_path: Path to SQLite database
             output_dir: Directory to save CSV files
+            compress: Name default output files *.csv.gz so they are written gzipped
+                (off by default: Excel opens the utf-8-sig CSVs but not .gz)
         """
         self.db_path = db_path
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.file_suffix = '.csv.gz' if compress else '.csv'
+        
+        # One cached connection per thread (export_all runs exports in a thread pool)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        
         logger.info(f"CSVExporterV2 initialized: {db_path} -> {output_dir}")
     
     def _get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_path)
+        """
+        Get this thread's read-only database connection, tuned for large scans
+        
+        The connection is opened and configured once per thread and then reused, so
+        later exports skip the setup and keep the page cache warmed by earlier ones.
+        Exports never write, so the file is opened with mode=ro (a missing DB raises
+        instead of being created empty) and query_only is set. journal_mode and
+        synchronous are writer settings; DatabaseV2 already puts the file in WAL,
+        which lets exports run while a crawl is committing.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        
+        # check_same_thread=False only so close() can run from another thread;
+        # each connection is still used by the one thread that opened it
+        conn = sqlite3.connect(f"{Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True,
+                               check_same_thread=False)
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute("PRAGMA cache_size=-200000")       # ~200MB page cache
+        conn.execute("PRAGMA temp_store=MEMORY")        # ORDER BY / GROUP BY sorts
+        conn.execute("PRAGMA mmap_size=1073741824")     # 1GB memory-mapped reads
+        
+        self._local.conn = conn
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
     
-    def export_products(self, filename: Optional[str] = None) -> str:
+    def close(self):
+        """Close all cached connections (they are reopened on the next export)"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._local = threading.local()
+    
+    def _open_output(self, output_path: Path, mode: str, **kwargs):
+        """Open an export file for writing, gzip-compressed when its name ends in .gz"""
+        if output_path.suffix == '.gz':
+            return gzip.open(output_path, mode, compresslevel=GZIP_COMPRESSLEVEL, **kwargs)
+        return open(output_path, mode, buffering=1 << 20, **kwargs)
+    
+    def _export_raw(self, query: str, output_path: Path) -> int:
+        """
+        Stream a query result straight to CSV without pandas
+        
+        Rows go from the cursor to csv.writer in fetchmany() batches, so memory stays
+        at one batch and no DataFrame is built. The file keeps the DataFrame.to_csv
+        layout (utf-8-sig BOM, header row, os.linesep line endings, repr() for floats),
+        but values are written as SQLite returns them: an INTEGER column containing
+        NULLs is written as 10, where pandas upcast it to float64 and wrote 10.0
+        (e.g. seller_total_follower, discount_rate, all_time_quantity_sold, seller_id).
+        Both forms parse to the same values with pd.read_csv.
+        
+        Args:
+            query: SELECT to export
+            output_path: CSV file to write
+            
+        Returns:
+            Number of rows written
+        """
+        conn = self._get_connection()
+        total = 0
+        with self._open_output(output_path, 'wt', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            cursor = conn.execute(query)
+            writer.writerow([col[0] for col in cursor.description])
+            while rows := cursor.fetchmany(EXPORT_FETCH_SIZE):
+                writer.writerows(rows)
+                total += len(rows)
+        return total
+    
+    def _export_chunked(self, query: str, output_path: Path,
+                        post_process: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                        chunksize: int = EXPORT_CHUNK_SIZE,
+                        dtype: Optional[Dict[str, str]] = None) -> int:
+        """
+        Stream a query result to CSV in DataFrame chunks, transforming each one
+        
+        Each chunk is read and passed through post_process on this thread, then handed
+        to a writer thread that formats and writes it while the next chunk is fetched.
+        The bounded queue keeps at most a few chunks in memory, and derived columns are
+        computed on a cache-sized working set. The file starts with a single UTF-8 BOM;
+        only the first chunk writes the header.
+        
+        read_sql_query infers dtypes per chunk, so a nullable INTEGER column is int64 in
+        a chunk without NULLs (written 25) and float64 in one with NULLs (25.0). Pass
+        such columns in dtype to give them one type, and one format, across the file.
+        
+        Args:
+            query: SELECT to export
+            output_path: CSV file to write
+            post_process: Optional per-chunk transform (must be row-wise)
+            chunksize: Rows per chunk
+            dtype: Fixed dtypes for columns whose inferred type can vary between chunks
+            
+        Returns:
+            Number of rows written
+        """
+        conn = self._get_connection()
+        total = 0
+        chunk_queue = queue.Queue(maxsize=2)
+        errors = []
+        
+        with self._open_output(output_path, 'wb') as f:
+            f.write(UTF8_BOM)
+            writer = threading.Thread(target=write_chunks_from_queue,
+                                      args=(chunk_queue, f, errors), daemon=True)
+            writer.start()
+            try:
+                for df in pd.read_sql_query(query, conn, chunksize=chunksize, dtype=dtype):
+                    if errors:
+                        break
+                    if post_process is not None:
+                        df = post_process(df)
+                    chunk_queue.put(df)
+                    total += len(df)
+            finally:
+                chunk_queue.put(None)
+                writer.join()
+        
+        if errors:
+            raise errors[0]
+        return total
+    
+    def export_products(self, filename: Optional[str] = None, timestamp: Optional[str] = None) -> str:
         """Export products table to CSV"""
         if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"products_{timestamp}.csv"
+            timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"products_{timestamp}{self.file_suffix}"
         
         output_path = self.output_dir / filename
         
         try:
-            conn = self._get_connection()
             query = """
                 SELECT 
                     id,
@@ -57,27 +226,24 @@ class CSVExporterV2:
                 ORDER BY category_id, id
             """
             
-            df = pd.read_sql_query(query, conn)
-            df.to_csv(output_path, index=False, encoding='utf-8-sig')
-            conn.close()
+            count = self._export_raw(query, output_path)
             
-            logger.info(f"Exported {len(df)} products to {output_path}")
+            logger.info(f"Exported {count} products to {output_path}")
             return str(output_path)
             
         except Exception as e:
             logger.error(f"Failed to export products: {e}")
             raise
     
-    def export_price_history(self, filename: Optional[str] = None) -> str:
+    def export_price_history(self, filename: Optional[str] = None, timestamp: Optional[str] = None) -> str:
         """Export price history to CSV"""
         if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"price_history_{timestamp}.csv"
+            timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"price_history_{timestamp}{self.file_suffix}"
         
         output_path = self.output_dir / filename
         
         try:
-            conn = self._get_connection()
             query = """
                 SELECT 
                     ph.id,
@@ -94,27 +260,24 @@ class CSVExporterV2:
                 ORDER BY ph.crawl_timestamp, ph.product_id
             """
             
-            df = pd.read_sql_query(query, conn)
-            df.to_csv(output_path, index=False, encoding='utf-8-sig')
-            conn.close()
+            count = self._export_raw(query, output_path)
             
-            logger.info(f"Exported {len(df)} price records to {output_path}")
+            logger.info(f"Exported {count} price records to {output_path}")
             return str(output_path)
             
         except Exception as e:
             logger.error(f"Failed to export price history: {e}")
             raise
     
-    def export_sales_history(self, filename: Optional[str] = None) -> str:
+    def export_sales_history(self, filename: Optional[str] = None, timestamp: Optional[str] = None) -> str:
         """Export sales history to CSV"""
         if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"sales_history_{timestamp}.csv"
+            timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"sales_history_{timestamp}{self.file_suffix}"
         
         output_path = self.output_dir / filename
         
         try:
-            conn = self._get_connection()
             query = """
                 SELECT 
                     sh.id,
@@ -129,27 +292,24 @@ class CSVExporterV2:
                 ORDER BY sh.crawl_timestamp, sh.product_id
             """
             
-            df = pd.read_sql_query(query, conn)
-            df.to_csv(output_path, index=False, encoding='utf-8-sig')
-            conn.close()
+            count = self._export_raw(query, output_path)
             
-            logger.info(f"Exported {len(df)} sales records to {output_path}")
+            logger.info(f"Exported {count} sales records to {output_path}")
             return str(output_path)
             
         except Exception as e:
             logger.error(f"Failed to export sales history: {e}")
             raise
     
-    def export_rating_history(self, filename: Optional[str] = None) -> str:
+    def export_rating_history(self, filename: Optional[str] = None, timestamp: Optional[str] = None) -> str:
         """Export rating history to CSV"""
         if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"rating_history_{timestamp}.csv"
+            timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"rating_history_{timestamp}{self.file_suffix}"
         
         output_path = self.output_dir / filename
         
         try:
-            conn = self._get_connection()
             query = """
                 SELECT 
                     rh.id,
@@ -164,27 +324,24 @@ class CSVExporterV2:
                 ORDER BY rh.crawl_timestamp, rh.product_id
             """
             
-            df = pd.read_sql_query(query, conn)
-            df.to_csv(output_path, index=False, encoding='utf-8-sig')
-            conn.close()
+            count = self._export_raw(query, output_path)
             
-            logger.info(f"Exported {len(df)} rating records to {output_path}")
+            logger.info(f"Exported {count} rating records to {output_path}")
             return str(output_path)
             
         except Exception as e:
             logger.error(f"Failed to export rating history: {e}")
             raise
     
-    def export_sellers(self, filename: Optional[str] = None) -> str:
+    def export_sellers(self, filename: Optional[str] = None, timestamp: Optional[str] = None) -> str:
         """Export sellers table to CSV"""
         if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"sellers_{timestamp}.csv"
+            timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"sellers_{timestamp}{self.file_suffix}"
         
         output_path = self.output_dir / filename
         
         try:
-            conn = self._get_connection()
             query = """
                 SELECT 
                     seller_id,
@@ -196,27 +353,24 @@ class CSVExporterV2:
                 ORDER BY seller_total_follower DESC
             """
             
-            df = pd.read_sql_query(query, conn)
-            df.to_csv(output_path, index=False, encoding='utf-8-sig')
-            conn.close()
+            count = self._export_raw(query, output_path)
             
-            logger.info(f"Exported {len(df)} sellers to {output_path}")
+            logger.info(f"Exported {count} sellers to {output_path}")
             return str(output_path)
             
         except Exception as e:
             logger.error(f"Failed to export sellers: {e}")
             raise
     
-    def export_product_details(self, filename: Optional[str] = None) -> str:
+    def export_product_details(self, filename: Optional[str] = None, timestamp: Optional[str] = None) -> str:
         """Export product details with parsed JSON fields"""
         if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"product_details_{timestamp}.csv"
+            timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"product_details_{timestamp}{self.file_suffix}"
         
         output_path = self.output_dir / filename
         
         try:
-            conn = self._get_connection()
             query = """
                 SELECT 
                     pd.id,
@@ -230,60 +384,43 @@ class CSVExporterV2:
                     pd.seller_id,
                     s.seller_name,
                     s.seller_total_follower,
-                    pd.crawl_timestamp
+                    pd.crawl_timestamp,
+                    
+                    -- Parsed JSON fields (json1, evaluated in C per row)
+                    COALESCE(json_extract(pd.brand, '$.name'), '') as brand_name,
+                    COALESCE(json_array_length(pd.specifications), 0) as spec_count,
+                    COALESCE(json_array_length(pd.badges), 0) as badge_count,
+                    COALESCE((
+                        SELECT group_concat(COALESCE(json_extract(b.value, '$.name'), ''), ', ')
+                        FROM json_each(pd.badges) b
+                    ), '') as badge_names
                 FROM product_details pd
                 JOIN products p ON pd.product_id = p.id
                 LEFT JOIN sellers s ON pd.seller_id = s.seller_id
-                ORDER BY pd.product_id
+                ORDER BY pd.product_id, pd.id
             """
             
-            df = pd.read_sql_query(query, conn)
-            
-            # Parse JSON columns to extract key info
-            if not df.empty:
-                # Extract brand name
-                df['brand_name'] = df['brand'].apply(
-                    lambda x: json.loads(x).get('name', '') if x and pd.notna(x) else ''
-                )
-                
-                # Count specifications
-                df['spec_count'] = df['specifications'].apply(
-                    lambda x: len(json.loads(x)) if x and pd.notna(x) else 0
-                )
-                
-                # Count badges
-                df['badge_count'] = df['badges'].apply(
-                    lambda x: len(json.loads(x)) if x and pd.notna(x) else 0
-                )
-                
-                # Extract badge names
-                df['badge_names'] = df['badges'].apply(
-                    lambda x: ', '.join([b.get('name', '') for b in json.loads(x)]) if x and pd.notna(x) else ''
-                )
-            
-            df.to_csv(output_path, index=False, encoding='utf-8-sig')
-            conn.close()
+            count = self._export_raw(query, output_path)
             
-            logger.info(f"Exported {len(df)} product details to {output_path}")
+            logger.info(f"Exported {count} product details to {output_path}")
             return str(output_path)
             
         except Exception as e:
             logger.error(f"Failed to export product details: {e}")
             raise
     
-    def export_latest_snapshot(self, filename: Optional[str] = None) -> str:
+    def export_latest_snapshot(self, filename: Optional[str] = None, timestamp: Optional[str] = None) -> str:
         """
         Export latest snapshot with all metrics joined
         This is the main file for analysis
         """
         if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"products_latest_snapshot_{timestamp}.csv"
+            timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"products_latest_snapshot_{timestamp}{self.file_suffix}"
         
         output_path = self.output_dir / filename
         
         try:
-            conn = self._get_connection()
             query = """
                 SELECT 
                     p.id as product_id,
@@ -307,10 +444,6 @@ class CSVExporterV2:
                     rh.rating_average,
                     rh.review_count,
                     
-                    -- Product details
-                    pd.brand,
-                    pd.badges,
-                    
                     -- Seller info
                     pd.seller_id,
                     s.seller_name,
@@ -319,39 +452,61 @@ class CSVExporterV2:
                     -- Timestamps
                     ph.crawl_timestamp as last_price_update,
                     sh.crawl_timestamp as last_sales_update,
-                    rh.crawl_timestamp as last_rating_update
+                    rh.crawl_timestamp as last_rating_update,
+                    
+                    -- Product details (brand/badges JSON parsed in SQL)
+                    COALESCE(json_extract(pd.brand, '$.name'), '') as brand_name,
+                    COALESCE((
+                        SELECT group_concat(COALESCE(json_extract(a.value, '$.name'), ''), ', ')
+                        FROM json_each(pd.brand, '$.authors') a
+                    ), '') as authors,
+                    COALESCE((
+                        SELECT group_concat(COALESCE(json_extract(b.value, '$.name'), ''), ', ')
+                        FROM json_each(pd.badges) b
+                    ), '') as badge_names,
+                    
+                    -- Bestseller flag: all_time_quantity_sold above its 75th percentile
+                    -- (pandas' linear quantile). With the n non-null values sorted and
+                    -- k = floor((n - 1) * 0.75), "value > quantile" is exactly "more than k
+                    -- values are smaller", i.e. RANK() - 1 > k. Computed here so the
+                    -- result can be streamed without a second pass over the joins.
+                    CASE
+                        WHEN sh.all_time_quantity_sold IS NULL THEN 0
+                        WHEN RANK() OVER (
+                            PARTITION BY sh.all_time_quantity_sold IS NULL
+                            ORDER BY sh.all_time_quantity_sold
+                        ) - 1 > (COUNT(sh.all_time_quantity_sold) OVER () - 1) * 3 / 4 THEN 1
+                        ELSE 0
+                    END as bestseller_flag
                     
                 FROM products p
                 
                 LEFT JOIN (
-                    SELECT product_id, price, original_price, discount, discount_rate, crawl_timestamp
+                    SELECT product_id, MAX(crawl_timestamp) AS crawl_timestamp
                     FROM price_history
-                    WHERE (product_id, crawl_timestamp) IN (
-                        SELECT product_id, MAX(crawl_timestamp)
-                        FROM price_history
-                        GROUP BY product_id
-                    )
-                ) ph ON p.id = ph.product_id
+                    GROUP BY product_id
+                ) latest_ph ON p.id = latest_ph.product_id
+                LEFT JOIN price_history ph
+                    ON ph.product_id = latest_ph.product_id
+                    AND ph.crawl_timestamp = latest_ph.crawl_timestamp
                 
                 LEFT JOIN (
-                    SELECT product_id, quantity_sold, all_time_quantity_sold, crawl_timestamp
+                    SELECT product_id, MAX(crawl_timestamp) AS crawl_timestamp
                     FROM sales_history
-                    WHERE (product_id, crawl_timestamp) IN (
-                        SELECT product_id, MAX(crawl_timestamp)
-                        FROM sales_history
-                        GROUP BY product_id
-                    )
-                ) sh ON p.id = sh.product_id
+                    GROUP BY product_id
+                ) latest_sh ON p.id = latest_sh.product_id
+                LEFT JOIN sales_history sh
+                    ON sh.product_id = latest_sh.product_id
+                    AND sh.crawl_timestamp = latest_sh.crawl_timestamp
                 
                 LEFT JOIN (
-                    SELECT product_id, rating_average, review_count, crawl_timestamp
+                    SELECT product_id, MAX(crawl_timestamp) AS crawl_timestamp
                     FROM rating_history
-                    WHERE (product_id, crawl_timestamp) IN (
-                        SELECT product_id, MAX(crawl_timestamp)
-                        FROM rating_history
-                        GROUP BY product_id
-                    )
-                ) rh ON p.id = rh.product_id
+                    GROUP BY product_id
+                ) latest_rh ON p.id = latest_rh.product_id
+                LEFT JOIN rating_history rh
+                    ON rh.product_id = latest_rh.product_id
+                    AND rh.crawl_timestamp = latest_rh.crawl_timestamp
                 
                 LEFT JOIN product_details pd ON p.id = pd.product_id
                 LEFT JOIN sellers s ON pd.seller_id = s.seller_id
@@ -359,51 +514,49 @@ class CSVExporterV2:
                 ORDER BY p.category_id, p.id
             """
             
-            df = pd.read_sql_query(query, conn)
-            
-            # Parse JSON columns
-            if not df.empty:
-                # Extract brand name
-                df['brand_name'] = df['brand'].apply(
-                    lambda x: json.loads(x).get('name', '') if pd.notna(x) and x else ''
-                )
-                
-                # Extract authors for books
-                df['authors'] = df['brand'].apply(
-                    lambda x: ', '.join([a.get('name', '') for a in json.loads(x).get('authors', [])]) 
-                    if pd.notna(x) and x and 'authors' in json.loads(x) else ''
-                )
-                
-                # Extract badge names
-                df['badge_names'] = df['badges'].apply(
-                    lambda x: ', '.join([b.get('name', '') for b in json.loads(x)]) 
-                    if pd.notna(x) and x else ''
-                )
+            def add_derived_metrics(df: pd.DataFrame) -> pd.DataFrame:
+                bestseller_flag = df.pop('bestseller_flag')
                 
-                # Drop JSON columns to keep CSV clean
-                df = df.drop(columns=['brand', 'badges'], errors='ignore')
-                
-                # Calculate derived metrics
-                df['price_drop_amount'] = df['original_price'] - df['current_price']
-                df['has_discount'] = df['discount_rate'] > 0
-                if len(df) > 0:
-                    df['is_bestseller'] = df['all_time_quantity_sold'] > df['all_time_quantity_sold'].quantile(0.75)
-                df['high_rating'] = df['rating_average'] >= 4.5
+                if not df.empty:
+                    # Calculate derived metrics
+                    df['price_drop_amount'] = df['original_price'] - df['current_price']
+                    df['has_discount'] = df['discount_rate'] > 0
+                    df['is_bestseller'] = bestseller_flag.astype(bool)
+                    df['high_rating'] = df['rating_average'] >= 4.5
+                return df
+            
+            # Nullable INTEGER columns get one dtype for every chunk. The LEFT JOIN columns
+            # are float64, as in a single-DataFrame read that contains NULLs (25.0, not 25
+            # in some chunks); category_id is rarely NULL, so it keeps its integer form
+            # via the nullable Int64 dtype
+            snapshot_dtypes = {
+                col: 'float64'
+                for col in ('discount_rate', 'quantity_sold', 'all_time_quantity_sold',
+                            'review_count', 'seller_id', 'seller_total_follower')
+            }
+            snapshot_dtypes['category_id'] = 'Int64'
             
-            df.to_csv(output_path, index=False, encoding='utf-8-sig')
-            conn.close()
+            count = self._export_chunked(query, output_path, post_process=add_derived_metrics,
+                                         dtype=snapshot_dtypes)
             
-            logger.info(f"Exported latest snapshot: {len(df)} products to {output_path}")
+            logger.info(f"Exported latest snapshot: {count} products to {output_path}")
             return str(output_path)
             
         except Exception as e:
             logger.error(f"Failed to export latest snapshot: {e}")
             raise
     
-    def export_all(self) -> Dict[str, str]:
+    def export_all(self, max_workers: Optional[int] = None) -> Dict[str, str]:
         """
         Export all tables to CSV
         
+        Exports run concurrently: each worker thread uses its own read-only connection,
+        each export writes its own file, and sqlite3 releases the GIL while stepping
+        queries. The per-thread connections are closed once all exports finish.
+        
+        Args:
+            max_workers: Export threads (default: one per export, capped at CPU count)
+        
         Returns:
             Dictionary mapping table name to file path
         """
@@ -421,13 +574,30 @@ class CSVExporterV2:
             ('latest_snapshot', self.export_latest_snapshot)
         ]
         
-        for name, export_func in exports:
-            try:
-                filepath = export_func()
-                results[name] = filepath
-                logger.info(f"✓ {name}: {filepath}")
-            except Exception as e:
-                logger.error(f"✗ {name}: {e}")
+        if max_workers is None:
+            max_workers = min(len(exports), os.cpu_count() or 1)
+        
+        # One timestamp for the whole set, so all file names match
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(export_func, timestamp=timestamp): name
+                       for name, export_func in exports}
+            
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    filepath = future.result()
+                    results[name] = filepath
+                    logger.info(f"✓ {name}: {filepath}")
+                except Exception as e:
+                    logger.error(f"✗ {name}: {e}")
+        
+        # The pool's threads are gone; release their connections
+        self.close()
+        
+        # Report in the usual table order rather than completion order
+        results = {name: results[name] for name, _ in exports if name in results}
         
         logger.info(f"Export completed: {len(results)}/{len(exports)} files created")
         return results
@@ -446,6 +616,8 @@ def main():
                        'sales_history', 'rating_history', 'sellers', 
                        'product_details', 'snapshot'],
                        default='all', help='Which table to export')
+    parser.add_argument('--compress', action='store_true',
+                       help='Write gzip-compressed .csv.gz files')
     
     args = parser.parse_args()
     
@@ -455,7 +627,7 @@ def main():
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
-    exporter = CSVExporterV2(args.db, args.output)
+    exporter = CSVExporterV2(args.db, args.output, compress=args.compress)
     
     if args.table == 'all':
         results = exporter.export_all()
@@ -474,6 +646,7 @@ def main():
         }
         
         filepath = export_map[args.table]()
+        exporter.close()
         print(f"\n✓ Exported to: {filepath}")
 
 